@@ -4,6 +4,7 @@ import pydot
 import tempfile
 import tkinter as tk
 from tkinter import filedialog
+from collections import OrderedDict
 from PIL import Image, ImageTk
 def extract_imports_from_file(path: str):
     imports = []
@@ -89,6 +90,51 @@ def render_graph(graph):
     tmp = tempfile.NamedTemporaryFile(suffix=".png", delete=False)
     graph.write_png(tmp.name)
     return tmp.name
+ZOOM_LEVELS = [0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.75, 1.0, 1.5, 2.0, 3.0, 4.0, 6.0, 8.0, 12.0]
+TILE_SIZE = 512
+TILE_MEMORY_BUDGET = 192 * 1024 * 1024  # bytes of RGBA tiles kept over all zoom levels
+FAST_FILTER = Image.NEAREST             # while the wheel is moving
+REFINE_DELAY_MS = 150                   # LANCZOS pass once the wheel has been still this long
+class TilePyramid:
+    # Zoom levels of one image cut into tiles; a tile is resized only when it is in view, and the
+    # least recently shown tiles are dropped once the cache is over its memory budget
+    def __init__(self, image, budget=TILE_MEMORY_BUDGET, tile_size=TILE_SIZE):
+        self.image = image
+        self.budget = budget
+        self.tile_size = tile_size
+        self.tiles = OrderedDict()  # (level, tx, ty) -> (refined, PhotoImage, bytes)
+        self.used = 0
+    def level_size(self, level):
+        return max(1, int(self.image.width * level)), max(1, int(self.image.height * level))
+    def visible_tiles(self, level, x0, y0, x1, y1):
+        w, h = self.level_size(level)
+        t = self.tile_size
+        tx0, ty0 = max(0, int(x0 // t)), max(0, int(y0 // t))
+        tx1, ty1 = min((w - 1) // t, int(x1 // t)), min((h - 1) // t, int(y1 // t))
+        return [(tx, ty) for ty in range(ty0, ty1 + 1) for tx in range(tx0, tx1 + 1)]
+    def tile(self, level, tx, ty, refined=True):
+        # refined=False takes any cached tile, else makes a FAST_FILTER one; returns (PhotoImage, refined)
+        key = (level, tx, ty)
+        hit = self.tiles.get(key)
+        if hit and (hit[0] or not refined):
+            self.tiles.move_to_end(key)
+            return hit[1], hit[0]
+        w, h = self.level_size(level)
+        t = self.tile_size
+        x0, y0 = tx * t, ty * t
+        x1, y1 = min(w, x0 + t), min(h, y0 + t)
+        sx, sy = self.image.width / w, self.image.height / h
+        region = self.image.resize((x1 - x0, y1 - y0), Image.LANCZOS if refined else FAST_FILTER,
+                                   box=(x0 * sx, y0 * sy, x1 * sx, y1 * sy))
+        photo = ImageTk.PhotoImage(region)
+        if hit: self.used -= hit[2]
+        self.tiles[key] = (refined, photo, region.width * region.height * 4)
+        self.tiles.move_to_end(key)
+        self.used += self.tiles[key][2]
+        while self.used > self.budget and len(self.tiles) > 1:
+            _, (_, _, size) = self.tiles.popitem(last=False)
+            self.used -= size
+        return photo, refined
 class DependencyViewer(tk.Tk):
     def __init__(self):
         super().__init__()
@@ -100,20 +146,22 @@ class DependencyViewer(tk.Tk):
         self.canvas = tk.Canvas(self, bg="#f0f0f0", 
                                 yscrollcommand=self.v_scroll.set, 
                                 xscrollcommand=self.h_scroll.set)
-        self.v_scroll.config(command=self.canvas.yview)
-        self.h_scroll.config(command=self.canvas.xview)
+        self.v_scroll.config(command=self.on_yview)
+        self.h_scroll.config(command=self.on_xview)
         self.v_scroll.pack(side="right", fill="y")
         self.h_scroll.pack(side="bottom", fill="x")
         self.canvas.pack(side="left", fill="both", expand=True)
-        self.image_cache = {}  
+        self.pyramid = None
+        self.drawn_tiles = {}  # (tx, ty) -> (canvas item, PhotoImage)
+        self.drawn_key = None  # (level, image offset) the drawn tiles belong to
+        self.image_offset = (0, 0)
+        self.refine_job = None
         menu = tk.Menu(self)
         filemenu = tk.Menu(menu, tearoff=0)
         filemenu.add_command(label="Open File / Folder", command=self.load_path)
         menu.add_cascade(label="File", menu=filemenu)
         self.config(menu=menu)
-        self.tkimg = None
         self.original_image = None
-        self.current_image = None
         self.zoom_factor = 1.0
         self.canvas.bind("<MouseWheel>", self.on_mouse_wheel)
         self.canvas.bind("<Shift-MouseWheel>", self.on_shift_wheel)
@@ -126,30 +174,14 @@ class DependencyViewer(tk.Tk):
         self.canvas.bind("<ButtonPress-1>", self.on_click_start)
         self.canvas.bind("<B1-Motion>", self.on_drag_select)
         self.canvas.bind("<ButtonRelease-1>", self.on_click_release)
+        self.canvas.bind("<Configure>", lambda e: self.update_canvas_image())
 
         self.pending_wheel_steps = 0
         self._zoom_job_scheduled = False
 
 
-    def build_zoom_cache(self):
-        base = self.original_image
-        zoom_levels = [
-            0.1, 0.2, 0.3, 0.5,
-            0.75, 1.0,
-            1.5, 2.0, 3.0, 4.0,
-            6.0, 8.0, 12.0
-        ]
-        self.image_cache = {}
-        for z in zoom_levels:
-            w = int(base.width * z)
-            h = int(base.height * z)
-            self.image_cache[z] = base.resize((w, h), Image.LANCZOS)
-            
-    def get_cached_zoom(self, z):
-        if not self.image_cache:
-            return self.original_image
-        nearest = min(self.image_cache.keys(), key=lambda k: abs(k - z))
-        return self.image_cache[nearest]
+    def nearest_level(self, z):
+        return min(ZOOM_LEVELS, key=lambda k: abs(k - z))
     
     def load_path(self):
         path = filedialog.askopenfilename(filetypes=[("Python files", "*.py"), ("All files", "*.*")])
@@ -165,65 +197,31 @@ class DependencyViewer(tk.Tk):
     def display_image(self, path):
         self.original_image = Image.open(path).convert("RGBA")
         self.zoom_factor = 1.0
-        self.image_cache = {}
-        self.current_image = self.original_image
+        self.pyramid = TilePyramid(self.original_image)
+        self.drawn_key = None
         self._last_image_size = (self.original_image.width, self.original_image.height)
-        self.build_zoom_cache_quick()
         self.update_canvas_image()
-        self.after(100, lambda: self.build_zoom_cache_full())
         
-    def build_zoom_cache_quick(self):
-        base = self.original_image
-        quick_levels = [0.5, 1.0, 2.0]
-        self.image_cache = {}
-        try:
-            for z in quick_levels:
-                w = max(1, int(base.width * z))
-                h = max(1, int(base.height * z))
-                self.image_cache[z] = base.resize((w, h), Image.LANCZOS)
-        except Exception:
-            self.image_cache = {1.0: base}
-            
-    def build_zoom_cache_full(self):
-        base = self.original_image
-        full_levels = [
-            0.1, 0.2, 0.3, 0.4, 0.6, 0.75,
-            1.5, 3.0, 4.0, 6.0, 8.0, 12.0
-        ]
-        remaining = [z for z in full_levels if z not in self.image_cache]
-        
-        def build_chunk(idx=0, chunk_size=2):
-            if idx >= len(remaining):
-                return
-            end = min(idx + chunk_size, len(remaining))
-            for j in range(idx, end):
-                z = remaining[j]
-                try:
-                    w = max(1, int(base.width * z))
-                    h = max(1, int(base.height * z))
-                    self.image_cache[z] = base.resize((w, h), Image.LANCZOS)
-                except Exception:
-                    pass
-            self.after(20, lambda: build_chunk(end, chunk_size))
-        build_chunk(0, chunk_size=2)
-        
-    def get_cached_zoom(self, z):
-        if not self.image_cache:
-            return self.original_image
-        nearest = min(self.image_cache.keys(), key=lambda k: abs(k - z))
-        return self.image_cache[nearest]
+    def size_canvas_to_level(self):
+        # Scroll region for the current zoom level; an image smaller than the canvas is centered
+        w, h = self.pyramid.level_size(self.nearest_level(self.zoom_factor))
+        self._last_image_size = (w, h)
+        self.canvas.config(scrollregion=(0, 0, w, h))
+        cw = self.canvas.winfo_width()
+        ch = self.canvas.winfo_height()
+        if w <= cw or h <= ch:
+            self.image_offset = (max(0, (cw - w) // 2), max(0, (ch - h) // 2))
+            self.canvas.xview_moveto(0)
+            self.canvas.yview_moveto(0)
+            return w, h, True
+        self.image_offset = (0, 0)
+        return w, h, False
     
     def update_canvas_image(self, center_on_rect=None):
-        if not self.original_image:
+        if not self.pyramid:
             return
-        self.current_image = self.get_cached_zoom(self.zoom_factor)
-        w, h = self.current_image.size
-        self._last_image_size = (w, h)
-        self.tkimg = ImageTk.PhotoImage(self.current_image)
-        self.canvas.delete("img") 
-        self.canvas.create_image(0, 0, anchor="nw", image=self.tkimg, tags="img")
-        self.canvas.config(scrollregion=(0, 0, w, h))
-        if center_on_rect:
+        w, h, smaller = self.size_canvas_to_level()
+        if center_on_rect and not smaller:
             cx, cy = center_on_rect
             cw = self.canvas.winfo_width()
             ch = self.canvas.winfo_height()
@@ -231,12 +229,58 @@ class DependencyViewer(tk.Tk):
             target_y = h * cy - (ch / 2)
             self.canvas.xview_moveto(target_x / w)
             self.canvas.yview_moveto(target_y / h)
+        self.draw_visible_tiles()
+    
+    def draw_visible_tiles(self, refined=True):
+        # Only tiles in view get canvas items; unrefined (fast filter) ones are redone after REFINE_DELAY_MS
+        if not self.pyramid:
+            return
+        level = self.nearest_level(self.zoom_factor)
+        if (level, self.image_offset) != self.drawn_key:
+            self.canvas.delete("img")
+            self.drawn_tiles = {}
+            self.drawn_key = (level, self.image_offset)
+        ox, oy = self.image_offset
+        x0 = self.canvas.canvasx(0) - ox
+        y0 = self.canvas.canvasy(0) - oy
+        x1 = x0 + self.canvas.winfo_width()
+        y1 = y0 + self.canvas.winfo_height()
+        t = self.pyramid.tile_size
+        drawn = {}
+        unrefined = False
+        for tx, ty in self.pyramid.visible_tiles(level, x0, y0, x1, y1):
+            photo, done = self.pyramid.tile(level, tx, ty, refined)
+            unrefined = unrefined or not done
+            item, shown = self.drawn_tiles.pop((tx, ty), (None, None))
+            if item is None:
+                item = self.canvas.create_image(ox + tx * t, oy + ty * t, anchor="nw", image=photo, tags="img")
+            elif shown is not photo:
+                self.canvas.itemconfigure(item, image=photo)
+            drawn[(tx, ty)] = (item, photo)
+        for item, _ in self.drawn_tiles.values():
+            self.canvas.delete(item)
+        self.drawn_tiles = drawn
+        self.canvas.tag_lower("img")
+        if self.refine_job is not None:
+            self.after_cancel(self.refine_job)
+            self.refine_job = None
+        if unrefined:
+            self.refine_job = self.after(REFINE_DELAY_MS, self.draw_visible_tiles)
+    
+    def on_xview(self, *args):
+        self.canvas.xview(*args)
+        self.draw_visible_tiles()
+    
+    def on_yview(self, *args):
+        self.canvas.yview(*args)
+        self.draw_visible_tiles()
             
     def on_shift_wheel(self, event):
         if event.delta > 0:
             self.canvas.yview_scroll(-1, "units")
         else:
             self.canvas.yview_scroll(1, "units")
+        self.draw_visible_tiles()
         return "break"
     
     def on_ctrl_wheel(self, event):
@@ -244,6 +288,7 @@ class DependencyViewer(tk.Tk):
             self.canvas.xview_scroll(-1, "units")
         else:
             self.canvas.xview_scroll(1, "units")
+        self.draw_visible_tiles()
         return "break"
     
     def on_mouse_wheel(self, event):
@@ -283,14 +328,8 @@ class DependencyViewer(tk.Tk):
                                                           self.canvas.winfo_height() // 2))
         ex, ey = last_pos
 
-        # Perform each step sequentially (this ensures each tick is applied)
-        # but we keep the per-step work minimal by relying on cached images.
-        if steps > 0:
-            for _ in range(steps):
-                self._apply_one_zoom_step(1.1, ex, ey)
-        else:
-            for _ in range(-steps):
-                self._apply_one_zoom_step(0.9, ex, ey)
+        # All ticks of this frame as one zoom step, so only the final level's tiles are made
+        self._apply_one_zoom_step(1.1 ** steps if steps > 0 else 0.9 ** -steps, ex, ey)
 
     def _apply_one_zoom_step(self, factor, event_x, event_y):
         # compute old/new zoom
@@ -306,30 +345,15 @@ class DependencyViewer(tk.Tk):
         rel_x = img_x_before / max(1, self._last_image_size[0])
         rel_y = img_y_before / max(1, self._last_image_size[1])
 
-        # update state & pick cached image
+        # update state & size the scroll region for the new level
         self.zoom_factor = new_zoom
-        self.current_image = self.get_cached_zoom(new_zoom)
-        new_w, new_h = self.current_image.size
-        self._last_image_size = (new_w, new_h)
-
-        # create tk image once per step (cached images are small/fast)
-        self.tkimg = ImageTk.PhotoImage(self.current_image)
-
-        # redraw (we always overwrite previous "img" — cheap)
-        self.canvas.delete("img")
-        self.canvas.create_image(0, 0, anchor="nw", image=self.tkimg, tags="img")
-        self.canvas.config(scrollregion=(0, 0, new_w, new_h))
+        new_w, new_h, smaller = self.size_canvas_to_level()
 
         # center-if-smaller behavior (keeps unzoom-to-corner fixed)
         canvas_w = self.canvas.winfo_width()
         canvas_h = self.canvas.winfo_height()
-        if new_w <= canvas_w or new_h <= canvas_h:
-            offset_x = max(0, (canvas_w - new_w) // 2)
-            offset_y = max(0, (canvas_h - new_h) // 2)
-            self.canvas.delete("img")
-            self.canvas.create_image(offset_x, offset_y, anchor="nw", image=self.tkimg, tags="img")
-            self.canvas.xview_moveto(0)
-            self.canvas.yview_moveto(0)
+        if smaller:
+            self.draw_visible_tiles(refined=False)
             return
 
         # compute where the image pixel lands after zoom
@@ -349,6 +373,9 @@ class DependencyViewer(tk.Tk):
         self.canvas.xview_moveto(new_view_x0)
         self.canvas.yview_moveto(new_view_y0)
 
+        # fast-filter tiles while the wheel moves; refined with LANCZOS once it settles
+        self.draw_visible_tiles(refined=False)
+
         
     def on_click_start(self, event):
         self.start_x = self.canvas.canvasx(event.x)
@@ -380,8 +407,7 @@ class DependencyViewer(tk.Tk):
         scale_y = canvas_h / box_height
         zoom_multiplier = min(scale_x, scale_y)
         self.zoom_factor *= zoom_multiplier
-        current_img_w = self.current_image.width
-        current_img_h = self.current_image.height
+        current_img_w, current_img_h = self._last_image_size
         center_x_px = (self.start_x + end_x) / 2
         center_y_px = (self.start_y + end_y) / 2
         ratio_x = center_x_px / current_img_w
@@ -4,6 +4,7 @@ import pydot
 import tempfile
 import tkinter as tk
 from tkinter import filedialog
+from collections import OrderedDict
 from PIL import Image, ImageTk
 
 # ---------------------------
@@ -92,6 +93,64 @@ def render_graph(graph):
     graph.write_png(tmp.name)
     return tmp.name
 
+# ------------------------------------------------
+# Zoom pyramid: tiles made on demand, memory-bounded
+# ------------------------------------------------
+ZOOM_LEVELS = [0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.75, 1.0, 1.5, 2.0, 3.0, 4.0, 6.0, 8.0, 12.0]
+TILE_SIZE = 512
+TILE_MEMORY_BUDGET = 192 * 1024 * 1024  # bytes of RGBA tiles kept over all zoom levels
+FAST_FILTER = Image.NEAREST             # while zoom keys are held down
+REFINE_DELAY_MS = 150                   # LANCZOS pass once zooming has stopped this long
+
+class TilePyramid:
+    """Zoom levels of one image, cut into tiles that are resized only when in view.
+
+    Tiles live in an LRU; the least recently shown ones are dropped once the
+    cache is over its memory budget.
+    """
+    def __init__(self, image, budget=TILE_MEMORY_BUDGET, tile_size=TILE_SIZE):
+        self.image = image
+        self.budget = budget
+        self.tile_size = tile_size
+        self.tiles = OrderedDict()          # (level, tx, ty) -> (refined, PhotoImage, bytes)
+        self.used = 0
+
+    def level_size(self, level):
+        return max(1, int(self.image.width * level)), max(1, int(self.image.height * level))
+
+    def visible_tiles(self, level, x0, y0, x1, y1):
+        """Tile coordinates covering the given region (level pixels)."""
+        w, h = self.level_size(level)
+        t = self.tile_size
+        tx0, ty0 = max(0, int(x0 // t)), max(0, int(y0 // t))
+        tx1, ty1 = min((w - 1) // t, int(x1 // t)), min((h - 1) // t, int(y1 // t))
+        return [(tx, ty) for ty in range(ty0, ty1 + 1) for tx in range(tx0, tx1 + 1)]
+
+    def tile(self, level, tx, ty, refined=True):
+        """Return (PhotoImage, refined). refined=False accepts any cached tile, else makes a FAST_FILTER one."""
+        key = (level, tx, ty)
+        hit = self.tiles.get(key)
+        if hit and (hit[0] or not refined):
+            self.tiles.move_to_end(key)
+            return hit[1], hit[0]
+        w, h = self.level_size(level)
+        t = self.tile_size
+        x0, y0 = tx * t, ty * t
+        x1, y1 = min(w, x0 + t), min(h, y0 + t)
+        sx, sy = self.image.width / w, self.image.height / h
+        region = self.image.resize((x1 - x0, y1 - y0), Image.LANCZOS if refined else FAST_FILTER,
+                                   box=(x0 * sx, y0 * sy, x1 * sx, y1 * sy))
+        photo = ImageTk.PhotoImage(region)
+        if hit:
+            self.used -= hit[2]
+        self.tiles[key] = (refined, photo, region.width * region.height * 4)
+        self.tiles.move_to_end(key)
+        self.used += self.tiles[key][2]
+        while self.used > self.budget and len(self.tiles) > 1:
+            _, (_, _, size) = self.tiles.popitem(last=False)
+            self.used -= size
+        return photo, refined
+
 # ------------------------------------------------
 # Main app: dependency viewer with Q/W zoom keys
 # ------------------------------------------------
@@ -107,8 +166,8 @@ class DependencyViewer(tk.Tk):
         self.canvas = tk.Canvas(self, bg="#f0f0f0", 
                                 yscrollcommand=self.v_scroll.set,
                                 xscrollcommand=self.h_scroll.set)
-        self.v_scroll.config(command=self.canvas.yview)
-        self.h_scroll.config(command=self.canvas.xview)
+        self.v_scroll.config(command=self.on_yview)
+        self.h_scroll.config(command=self.on_xview)
         self.v_scroll.pack(side="right", fill="y")
         self.h_scroll.pack(side="bottom", fill="x")
         self.canvas.pack(side="left", fill="both", expand=True)
@@ -122,13 +181,15 @@ class DependencyViewer(tk.Tk):
 
         # image state
         self.original_image = None          # PIL original
-        self.current_image = None           # PIL currently displayed (from cache)
-        self.tkimg = None                   # PhotoImage reference
         self.zoom_factor = 1.0
         self._last_image_size = (1, 1)      # current displayed image pixel size (w, h)
 
-        # image cache (small set for responsiveness)
-        self.image_cache = {}
+        # zoom pyramid (tiles made for the visible region only)
+        self.pyramid = None
+        self.drawn_tiles = {}               # (tx, ty) -> (canvas item, PhotoImage)
+        self.drawn_key = None               # (level, image offset) the drawn tiles belong to
+        self.image_offset = (0, 0)          # top-left of the image when it is smaller than the canvas
+        self.refine_job = None
 
         # bindings
         # remove mouse-wheel zoom entirely (no wheel bindings)
@@ -142,55 +203,60 @@ class DependencyViewer(tk.Tk):
         self.canvas.bind("<ButtonPress-1>", self.on_click_start)
         self.canvas.bind("<B1-Motion>", self.on_drag_select)
         self.canvas.bind("<ButtonRelease-1>", self.on_click_release)
+        self.canvas.bind("<Configure>", lambda e: self.update_canvas_image())
 
     # ----------------------------
-    # Caching helpers
+    # Tiles
     # ----------------------------
-    def build_quick_cache(self):
-        """Build a small helpful cache to keep navigation snappy."""
-        if not self.original_image:
-            return
-        base = self.original_image
-        quick_levels = [0.5, 1.0, 2.0]
-        self.image_cache = {}
-        for z in quick_levels:
-            try:
-                w = max(1, int(base.width * z))
-                h = max(1, int(base.height * z))
-                self.image_cache[z] = base.resize((w, h), Image.LANCZOS)
-            except Exception:
-                pass
-        # always keep original size available
-        if 1.0 not in self.image_cache:
-            self.image_cache[1.0] = base
-
-    def build_full_cache(self):
-        """Build more zoom levels in background (not blocking)."""
-        if not self.original_image:
+    def nearest_level(self, z):
+        """Pyramid level shown for zoom factor z."""
+        return min(ZOOM_LEVELS, key=lambda k: abs(k - z))
+
+    def draw_visible_tiles(self, refined=True):
+        """Give the tiles in view canvas items; unrefined (fast filter) ones are redone after REFINE_DELAY_MS."""
+        if not self.pyramid:
             return
-        base = self.original_image
-        all_levels = [0.1, 0.2, 0.3, 0.4, 0.6, 0.75, 1.5, 3.0, 4.0, 6.0, 8.0, 12.0]
-        remaining = [z for z in all_levels if z not in self.image_cache]
-        def chunk(i=0, chunk_size=2):
-            if i >= len(remaining):
-                return
-            for j in range(i, min(i+chunk_size, len(remaining))):
-                z = remaining[j]
-                try:
-                    w = max(1, int(base.width * z))
-                    h = max(1, int(base.height * z))
-                    self.image_cache[z] = base.resize((w, h), Image.LANCZOS)
-                except Exception:
-                    pass
-            self.after(30, lambda: chunk(i+chunk_size, chunk_size))
-        chunk()
-
-    def get_cached_zoom(self, z):
-        """Return nearest cached PIL image for requested zoom z."""
-        if not self.image_cache:
-            return self.original_image
-        nearest = min(self.image_cache.keys(), key=lambda k: abs(k - z))
-        return self.image_cache[nearest]
+        level = self.nearest_level(self.zoom_factor)
+        if (level, self.image_offset) != self.drawn_key:
+            self.canvas.delete("img")
+            self.drawn_tiles = {}
+            self.drawn_key = (level, self.image_offset)
+        ox, oy = self.image_offset
+        x0 = self.canvas.canvasx(0) - ox
+        y0 = self.canvas.canvasy(0) - oy
+        x1 = x0 + self.canvas.winfo_width()
+        y1 = y0 + self.canvas.winfo_height()
+        t = self.pyramid.tile_size
+        drawn = {}
+        unrefined = False
+        for tx, ty in self.pyramid.visible_tiles(level, x0, y0, x1, y1):
+            photo, done = self.pyramid.tile(level, tx, ty, refined)
+            unrefined = unrefined or not done
+            item, shown = self.drawn_tiles.pop((tx, ty), (None, None))
+            if item is None:
+                item = self.canvas.create_image(ox + tx * t, oy + ty * t, anchor="nw", image=photo, tags="img")
+            elif shown is not photo:
+                self.canvas.itemconfigure(item, image=photo)
+            drawn[(tx, ty)] = (item, photo)
+        # tiles that scrolled out of view
+        for item, _ in self.drawn_tiles.values():
+            self.canvas.delete(item)
+        self.drawn_tiles = drawn
+        self.canvas.tag_lower("img")
+
+        if self.refine_job is not None:
+            self.after_cancel(self.refine_job)
+            self.refine_job = None
+        if unrefined:
+            self.refine_job = self.after(REFINE_DELAY_MS, self.draw_visible_tiles)
+
+    def on_xview(self, *args):
+        self.canvas.xview(*args)
+        self.draw_visible_tiles()
+
+    def on_yview(self, *args):
+        self.canvas.yview(*args)
+        self.draw_visible_tiles()
 
     # ----------------------------
     # Loading and drawing
@@ -208,45 +274,42 @@ class DependencyViewer(tk.Tk):
         self.display_image(img_path)
 
     def display_image(self, path):
-        """Load an image, reset state and show quickly."""
+        """Load an image, reset state and show quickly (tiles are made as they come into view)."""
         self.original_image = Image.open(path).convert("RGBA")
         self.zoom_factor = 1.0
-        self.image_cache = {}
-        self.current_image = self.original_image
+        self.pyramid = TilePyramid(self.original_image)
+        self.drawn_key = None
         self._last_image_size = (self.original_image.width, self.original_image.height)
-
-        self.build_quick_cache()
         self.update_canvas_image()
-        # schedule full cache build in the background
-        self.after(150, self.build_full_cache)
-
-    def update_canvas_image(self, center_on_rect=None):
-        """Draw current_image on canvas and update scrollregion. Optionally center on ratio coords."""
-        if not self.original_image:
-            return
 
-        self.current_image = self.get_cached_zoom(self.zoom_factor)
-        w, h = self.current_image.size
+    def size_canvas_to_level(self):
+        """Set the scrollregion for the current level; return (w, h, smaller than canvas)."""
+        w, h = self.pyramid.level_size(self.nearest_level(self.zoom_factor))
         self._last_image_size = (w, h)
-
-        self.tkimg = ImageTk.PhotoImage(self.current_image)
-        # clear and draw
-        self.canvas.delete("img")
-        self.canvas.create_image(0, 0, anchor="nw", image=self.tkimg, tags="img")
         self.canvas.config(scrollregion=(0, 0, w, h))
 
         # If image smaller than canvas, center it
         canvas_w = self.canvas.winfo_width()
         canvas_h = self.canvas.winfo_height()
         if w <= canvas_w or h <= canvas_h:
-            # draw centered with offset
-            offset_x = max(0, (canvas_w - w) // 2)
-            offset_y = max(0, (canvas_h - h) // 2)
-            self.canvas.delete("img")
-            self.canvas.create_image(offset_x, offset_y, anchor="nw", image=self.tkimg, tags="img")
+            self.image_offset = (max(0, (canvas_w - w) // 2), max(0, (canvas_h - h) // 2))
             # scrollbars not meaningful when image smaller; reset to origin
             self.canvas.xview_moveto(0)
             self.canvas.yview_moveto(0)
+            return w, h, True
+        self.image_offset = (0, 0)
+        return w, h, False
+
+    def update_canvas_image(self, center_on_rect=None, refined=True):
+        """Show the current zoom level and update scrollregion. Optionally center on ratio coords."""
+        if not self.pyramid:
+            return
+
+        w, h, smaller = self.size_canvas_to_level()
+        canvas_w = self.canvas.winfo_width()
+        canvas_h = self.canvas.winfo_height()
+        if smaller:
+            self.draw_visible_tiles(refined)
             return
 
         # If a center_on_rect is provided (ratios 0..1), place that center in the canvas center
@@ -258,6 +321,7 @@ class DependencyViewer(tk.Tk):
             ny = max(0.0, min(1.0, target_y / max(1, h)))
             self.canvas.xview_moveto(nx)
             self.canvas.yview_moveto(ny)
+        self.draw_visible_tiles(refined)
 
     # ----------------------------
     # Keybindings: Q/W zoom
@@ -311,28 +375,15 @@ class DependencyViewer(tk.Tk):
         rel_x = img_x_before / max(1, self._last_image_size[0])
         rel_y = img_y_before / max(1, self._last_image_size[1])
 
-        # update zoom and pick nearest cached image
+        # update zoom and size the scrollregion for the nearest level
         self.zoom_factor = new_zoom
-        self.current_image = self.get_cached_zoom(new_zoom)
-        new_w, new_h = self.current_image.size
-        self._last_image_size = (new_w, new_h)
-
-        # redraw
-        self.tkimg = ImageTk.PhotoImage(self.current_image)
-        self.canvas.delete("img")
-        self.canvas.create_image(0, 0, anchor="nw", image=self.tkimg, tags="img")
-        self.canvas.config(scrollregion=(0, 0, new_w, new_h))
+        new_w, new_h, smaller = self.size_canvas_to_level()
 
-        # If image smaller than canvas, center and done
+        # If image smaller than canvas, centered; fast tiles now, refined once the keys are released
         canvas_w = self.canvas.winfo_width()
         canvas_h = self.canvas.winfo_height()
-        if new_w <= canvas_w or new_h <= canvas_h:
-            offset_x = max(0, (canvas_w - new_w) // 2)
-            offset_y = max(0, (canvas_h - new_h) // 2)
-            self.canvas.delete("img")
-            self.canvas.create_image(offset_x, offset_y, anchor="nw", image=self.tkimg, tags="img")
-            self.canvas.xview_moveto(0)
-            self.canvas.yview_moveto(0)
+        if smaller:
+            self.draw_visible_tiles(refined=False)
             return
 
         # compute where the anchored pixel lands after zoom
@@ -351,6 +402,7 @@ class DependencyViewer(tk.Tk):
 
         self.canvas.xview_moveto(new_view_x0)
         self.canvas.yview_moveto(new_view_y0)
+        self.draw_visible_tiles(refined=False)
 
     # ----------------------------
     # Marquee zoom (click-drag)
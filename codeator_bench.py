@@ -0,0 +1,310 @@
+#benchmark for the scan/layout/draw pipeline
+#generates a synthetic project, times each stage, writes json
+#compare versions: python codeator_bench.py -t codeator3.8.py -t codeator3.9.py -o bench.json
+
+import argparse
+import atexit
+import importlib
+import inspect
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+def load_target(path: str):
+    # Imported from a copy under a valid module name: process pools pickle functions by module name,
+    # and spawned workers have to import that module again from sys.path
+    name = "codeator_bench_target_" + os.path.basename(path).replace(".py", "").replace(".", "_")
+    target_dir = tempfile.mkdtemp(prefix="codeator_bench_")
+    atexit.register(shutil.rmtree, target_dir, True)
+    shutil.copyfile(path, os.path.join(target_dir, name + ".py"))
+    sys.path.insert(0, target_dir)
+    return importlib.import_module(name)
+def generate_project(root: str, modules=20, classes=3, methods=5, functions=4, calls=3, data_files=2, seed=0):
+    rng = random.Random(seed)
+    pkg = os.path.join(root, "synthetic")
+    os.makedirs(pkg, exist_ok=True)
+    mod_funcs = {f"mod{m}": [f"func{m}_{f}" for f in range(functions)] for m in range(modules)}
+    all_funcs = [fn for funcs in mod_funcs.values() for fn in funcs]
+    for m in range(modules):
+        mod = f"mod{m}"
+        lines = []
+        imports = set()
+        method_names = [f"m{c}_{k}" for c in range(classes) for k in range(methods)]
+        local_names = mod_funcs[mod] + method_names
+        def body(indent, in_class=False):
+            out = []
+            for _ in range(calls):
+                target = rng.choice(local_names)
+                if target in method_names and not in_class:
+                    target = rng.choice(all_funcs)
+                    owner = target[4:].split("_")[0]
+                    if owner != str(m): imports.add(f"from .mod{owner} import {target}")
+                out.append(f"{indent}self.{target}()" if target in method_names else f"{indent}{target}()")
+            for d in range(data_files):
+                if rng.random() < 0.3:
+                    out.append(f"{indent}with open(\"data_{rng.randrange(data_files * 4)}.json\") as f:")
+                    out.append(f"{indent}    json.load(f)")
+            return out or [f"{indent}pass"]
+        for fn in mod_funcs[mod]:
+            lines.append(f"def {fn}():")
+            lines += body("    ")
+            lines.append("")
+        for c in range(classes):
+            base = f"(Cls{m}_{c - 1})" if c and rng.random() < 0.5 else ""
+            lines.append(f"class Cls{m}_{c}{base}:")
+            for k in range(methods):
+                lines.append(f"    def m{c}_{k}(self):")
+                lines += body("        ", in_class=True)
+            lines.append("")
+        header = ["import json", "import os"] + sorted(imports) + [""]
+        with open(os.path.join(pkg, f"{mod}.py"), "w", encoding="utf-8") as f:
+            f.write("\n".join(header + lines))
+    return pkg
+class NoLayoutCache:
+    def get(self, key):
+        return None
+    def put(self, key, layout):
+        pass
+    def recorded(self, key, lines):
+        return lines
+class HeadlessCanvas:
+    # Stands in for tk.Canvas: every call succeeds and create_* calls are counted
+    def __init__(self):
+        self.items = 0
+    def bbox(self, *args):
+        return None
+    def winfo_width(self):
+        return 1200
+    def winfo_height(self):
+        return 800
+    def canvasx(self, x):
+        return x
+    def canvasy(self, y):
+        return y
+    def __getattr__(self, name):
+        if name.startswith("create_"):
+            def create(*args, **kwargs):
+                self.items += 1
+                return self.items
+            return create
+        return lambda *args, **kwargs: None
+class Flag:
+    def __init__(self, value):
+        self.value = value
+    def get(self):
+        return self.value
+    def set(self, value):
+        self.value = value
+def headless_viewer(module, scan_results):
+    cls = module.NativeGraphViewer
+    viewer = cls.__new__(cls)
+    viewer.canvas = HeadlessCanvas()
+    viewer.tooltip = HeadlessCanvas()
+    viewer.unused_listbox = HeadlessCanvas()
+    for attr in ("after", "after_cancel", "after_idle", "update_idletasks", "title"):
+        setattr(viewer, attr, lambda *args, **kwargs: None)
+    for var in ("show_funcs_var", "show_methods_var", "show_files_var", "show_dynamic_var"):
+        setattr(viewer, var, Flag(True))
+    viewer.live_var = Flag(False)
+    viewer.compact_var = Flag(False)
+    viewer.engine_var = Flag("dot")
+    viewer.per_module_var = Flag(False)
+    viewer.imports_var = Flag(False)
+    viewer.status_var = Flag("")
+    if not hasattr(cls, "init_state"):
+        # Older viewers set their state up in __init__
+        viewer.hidden_nodes, viewer.unused_map, viewer.scale = {}, {}, 1.0
+        viewer.node_type_map, viewer.safe_id_map, viewer.layout_nodes, viewer.layout_edges = {}, {}, [], []
+        viewer.structure_graph, viewer.dependencies, viewer.source_map = scan_results[:3]
+        return viewer
+    viewer.init_state()
+    viewer.background = False  # run jobs inline
+    viewer.structure_graph, viewer.dependencies, viewer.source_map, viewer.data_file_nodes, viewer.data_callers = scan_results
+    return viewer
+def precomputed_layout_job(module, structure_graph, deps, data_file_nodes, flags):
+    # What the viewer's layout job hands to apply_layout, computed once outside the timed draw
+    job = module.BackgroundJob(module.layout_job, structure_graph, deps, data_file_nodes, flags)
+    job.run()
+    while True:
+        kind, value = job.messages.get_nowait()
+        if kind == "done": return value
+        if kind == "error": raise value
+def headless_draw(module, viewer, layout):
+    # Returns the draw callable, timed against an already computed layout so the stage is drawing only
+    if hasattr(type(viewer), "apply_layout"):
+        def draw():
+            viewer.view_fitted = False
+            viewer.apply_layout(layout)
+        return draw
+    def draw():
+        # Older draw_graph runs get_layout_data itself; hand it the precomputed result instead
+        original = module.get_layout_data
+        module.get_layout_data = lambda *args, **kwargs: layout
+        try:
+            viewer.draw_graph()
+        finally:
+            module.get_layout_data = original
+    return draw
+def time_stage(fn, repeat):
+    runs = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        runs.append(time.perf_counter() - start)
+    return {"seconds": statistics.median(runs), "runs": runs}, result
+def run_stage(stages, name, fn, repeat, check=None):
+    # check(result) returns an error message when the stage ran but produced nothing usable
+    try:
+        timing, result = time_stage(fn, repeat)
+    except Exception as e:
+        stages[name] = {"error": f"{type(e).__name__}: {e}"}
+        return None
+    problem = check(result) if check else None
+    stages[name] = {"error": problem} if problem else timing
+    return None if problem else result
+def layout_failed(layout):
+    return "layout failed (is dot on PATH?)" if layout is None or layout[0] is None else None
+def bench_target(target: str, project: str, repeat: int, workers: int):
+    module = load_target(target)
+    for cache in ("LAYOUT_CACHE", "SUBLAYOUT_CACHE"):
+        if hasattr(module, cache):
+            setattr(module, cache, NoLayoutCache())
+    stages = {}
+    counts = {}
+    flags = {"function": True, "method": True, "data": True, "dynamic_data": True}
+    scan_kwargs = {}
+    params = inspect.signature(module.scan_path_for_structure).parameters
+    if "workers" in params: scan_kwargs["workers"] = workers
+    if "use_cache" in params: scan_kwargs["use_cache"] = False
+    scan = run_stage(stages, "scan_path_for_structure", lambda: module.scan_path_for_structure(project, **scan_kwargs), repeat)
+    if hasattr(module, "extract_dependencies_from_file"):
+        files = []
+        for dirpath, _, names in os.walk(project):
+            files += [(os.path.join(dirpath, n), n[:-3]) for n in sorted(names) if n.endswith(".py")]
+        run_stage(stages, "extract_dependencies_from_file",
+                  lambda: [module.extract_dependencies_from_file(p, m) for p, m in files], repeat)
+    else:
+        stages["extract_dependencies_from_file"] = {"skipped": "not in target"}
+    if scan is None or not isinstance(scan, tuple) or len(scan) not in (3, 5):
+        for name in ("get_layout_data", "parse_plain_data", "draw_graph"):
+            stages[name] = {"skipped": "scan result has an unknown shape"}
+        return {"target": target, "stages": stages, "counts": counts}
+    structure_graph, deps = scan[:2]
+    data_file_nodes = scan[3] if len(scan) == 5 else set()
+    counts["modules"] = len(structure_graph)
+    counts["items"] = sum(len(items) for items in structure_graph.values())
+    counts["deps"] = sum(len(edge_list) for edge_list in deps.values())
+    # Older versions take only (structure_graph, deps)
+    layout_args = (structure_graph, deps, data_file_nodes, flags)[:len(inspect.signature(module.get_layout_data).parameters)]
+    plain_texts = []
+    parse = getattr(module, "parse_plain_data", None)
+    capture = parse is not None and not hasattr(module, "build_layout_graph")
+    if capture:
+        # Older versions only expose dot's output as what get_layout_data feeds parse_plain_data; keep it for that stage
+        module.parse_plain_data = lambda text: plain_texts.append(text) or parse(text)
+    try:
+        layout = run_stage(stages, "get_layout_data", lambda: module.get_layout_data(*layout_args), repeat, layout_failed)
+    finally:
+        if capture: module.parse_plain_data = parse
+    if layout:
+        counts["layout_nodes"] = len(layout[0])
+        counts["layout_edges"] = len(layout[1])
+    if plain_texts:
+        counts["plain_bytes"] = len(plain_texts[0])
+        run_stage(stages, "parse_plain_data", lambda: module.parse_plain_data(plain_texts[0]), repeat)
+    elif hasattr(module, "build_layout_graph") and hasattr(module, "parse_plain_data"):
+        try:
+            graph = module.build_layout_graph(structure_graph, deps, data_file_nodes, flags)[0]
+            plain_data = graph.create(format="plain").decode("utf-8")
+            counts["plain_bytes"] = len(plain_data)
+            run_stage(stages, "parse_plain_data", lambda: module.parse_plain_data(plain_data), repeat)
+        except Exception as e:
+            stages["parse_plain_data"] = {"error": f"{type(e).__name__}: {e}"}
+    else:
+        stages["parse_plain_data"] = {"skipped": "not in target"}
+    if hasattr(module, "layered_layout"):
+        graph = module.build_layout_graph(structure_graph, deps, data_file_nodes, flags)[0]
+        run_stage(stages, "layered_layout", lambda: module.layered_layout(graph), repeat)
+    else:
+        stages["layered_layout"] = {"skipped": "not in target"}
+    if hasattr(module, "modular_layout"):
+        graph, _, safe_id_map, _ = module.build_layout_graph(structure_graph, deps, data_file_nodes, flags)
+        run_stage(stages, "modular_layout", lambda: module.modular_layout(graph, safe_id_map, structure_graph), repeat,
+                  lambda result: "layout failed (is dot on PATH?)" if result is None else None)
+    else:
+        stages["modular_layout"] = {"skipped": "not in target"}
+    if hasattr(module, "build_import_graph"):
+        run_stage(stages, "build_import_graph", lambda: module.build_import_graph(structure_graph, deps), repeat)
+    else:
+        stages["build_import_graph"] = {"skipped": "not in target"}
+    if not hasattr(module, "NativeGraphViewer"):
+        stages["draw_graph"] = {"skipped": "no NativeGraphViewer in target"}
+    elif not layout:
+        stages["draw_graph"] = {"error": "no layout to draw"}
+    else:
+        viewer = headless_viewer(module, scan)
+        try:
+            drawn = precomputed_layout_job(module, structure_graph, deps, data_file_nodes, flags) if hasattr(module, "layout_job") else layout
+        except Exception as e:
+            stages["draw_graph"] = {"error": f"layout_job: {type(e).__name__}: {e}"}
+        else:
+            run_stage(stages, "draw_graph", headless_draw(module, viewer, drawn), repeat,
+                      lambda _: None if viewer.canvas.items else "nothing was drawn")
+            counts["canvas_items"] = viewer.canvas.items // max(1, repeat)
+    return {"target": target, "stages": stages, "counts": counts}
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the codeator scan/layout/draw pipeline on a synthetic project.")
+    parser.add_argument("-t", "--target", action="append", help="codeator script to benchmark (repeatable, default codeator3.9.py)")
+    parser.add_argument("-o", "--output", help="write json results here (default: stdout)")
+    parser.add_argument("--project", help="benchmark an existing folder instead of generating one")
+    parser.add_argument("--modules", type=int, default=20)
+    parser.add_argument("--classes", type=int, default=3, help="classes per module")
+    parser.add_argument("--methods", type=int, default=5, help="methods per class")
+    parser.add_argument("--functions", type=int, default=4, help="top-level functions per module")
+    parser.add_argument("--calls", type=int, default=3, help="call sites per function/method")
+    parser.add_argument("--data-files", type=int, default=2, help="open() data files per body (probability 0.3 each)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("-j", "--workers", type=int, default=1, help="scan processes for targets that support it")
+    args = parser.parse_args(argv)
+    here = os.path.dirname(os.path.abspath(__file__))
+    targets = args.target or [os.path.join(here, "codeator3.9.py")]
+    tmp = None
+    if args.project:
+        project = args.project
+    else:
+        tmp = tempfile.mkdtemp(prefix="codeator_bench_")
+        project = generate_project(tmp, args.modules, args.classes, args.methods, args.functions,
+                                   args.calls, args.data_files, args.seed)
+    try:
+        results = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "project": project if args.project else {
+                "modules": args.modules, "classes": args.classes, "methods": args.methods, "functions": args.functions,
+                "calls": args.calls, "data_files": args.data_files, "seed": args.seed,
+            },
+            "repeat": args.repeat,
+            "workers": args.workers,
+            "results": [bench_target(t, project, args.repeat, args.workers) for t in targets],
+        }
+    finally:
+        if tmp: shutil.rmtree(tmp, ignore_errors=True)
+    text = json.dumps(results, indent=1)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    for res in results["results"]:
+        summary = ", ".join(f"{k}={v['seconds']:.3f}s" for k, v in res["stages"].items() if "seconds" in v)
+        print(f"{os.path.basename(res['target'])}: {summary}", file=sys.stderr)
+    return 0
+if __name__ == "__main__":
+    sys.exit(main())